@@ -1,14 +1,36 @@
-import pandas as pd
-import json
+import orjson
 import sys
 from ollama import ChatResponse, chat
 from app.settings import settings
 from app.utils import (
-    get_csv_schema,
     check_and_pull_model,
     wait_for_ollama_connection,
 )
-from app.tools import query_csv_data
+from app.data import get_schema_and_rows
+from app.tools import QUERY_CSV_DATA_TOOL, TOOLS
+
+
+SYSTEM_PROMPT_TEMPLATE = (
+    "You are a helpful assistant that answers user questions "
+    "based on CSV file content. Use query_csv_data to fetch and analyze CSV data "
+    "CSV schema: {schema} CSV total rows: {total_rows} "
+)
+
+
+def _summarize_for_llm(result, max_rows: int = 50):
+    """
+    Shrinks a tool result before it is sent back to the model.
+
+    A single aggregated value is passed as a bare scalar, and results longer than
+    max_rows are cut to their first rows plus a marker with the total row count.
+    """
+    if not isinstance(result, list):
+        return result
+    if len(result) == 1 and len(result[0]) == 1:
+        return next(iter(result[0].values()))
+    if len(result) > max_rows:
+        return result[:max_rows] + [{"_truncated": True, "_total_rows": len(result)}]
+    return result
 
 
 def main():
@@ -33,15 +55,12 @@ def main():
         sys.exit(1)
 
     # === 1) Read CSV schema and build system prompt dynamically ===
-    schema = get_csv_schema()
-
-    # We can get the total number of rows in the CSV via pandas as well
-    total_rows = len(pd.read_csv(settings.csv_path, encoding="utf-8"))
+    schema, total_rows = get_schema_and_rows()
 
-    system_content = (
-        "You are a helpful assistant that answers user questions "
-        "based on CSV file content. Use query_csv_data to fetch and analyze CSV data "
-        f"CSV schema: {schema} CSV total rows: {total_rows} "
+    # Embed the schema as real JSON rather than a python repr
+    system_content = SYSTEM_PROMPT_TEMPLATE.format(
+        schema=orjson.dumps(schema, option=orjson.OPT_SERIALIZE_NUMPY).decode(),
+        total_rows=total_rows,
     )
 
     messages = [
@@ -55,50 +74,11 @@ def main():
         },
     ]
 
-    query_csv_data_tool = {
-        "type": "function",
-        "function": {
-            "name": "query_csv_data",
-            "description": "Queries and analyzes CSV data with filtering, grouping, and aggregation capabilities.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "select": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": 'List of columns to select, e.g. ["Freelancer_ID", "Job_Category"]',
-                    },
-                    "where": {
-                        "type": "object",
-                        "description": 'Filter conditions. Supports equality: {"Platform": "Fiverr"}, lists: {"Platform": ["Fiverr", "Upwork"]}, and operators: {"Job_Completed": {"$lt": 100}, "Earnings_USD": {"$gte": 5000}}. Operators: $lt, $lte, $gt, $gte, $ne, $eq, $in, $nin',
-                    },
-                    "group_by": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": 'Columns to group by, e.g. ["Payment_Method", "Platform"]',
-                    },
-                    "agg": {
-                        "type": "object",
-                        "description": 'Aggregation functions, e.g. {"Marketing_Spent": ["mean", "count"], "Job_Completed": "sum"}',
-                    },
-                    "sort_by": {
-                        "type": "string",
-                        "description": "Column name to sort results by",
-                    },
-                    "sort_desc": {
-                        "type": "boolean",
-                        "description": "Sort in descending order (default: false)",
-                    },
-                },
-            },
-        },
-    }
-
     print(f"=== Processing query: {user_content} ===")
     response: ChatResponse = chat(
         model=settings.model,
         messages=messages,
-        tools=[query_csv_data_tool],
+        tools=[QUERY_CSV_DATA_TOOL],
     )
 
     # === 2) Check if the model wants to call a tool ===
@@ -116,8 +96,9 @@ def main():
         print(f" → Function to call: {func_name}")
         print("   Arguments:", func_args)
 
-        if func_name == "query_csv_data":
-            tool_output = query_csv_data(**func_args)
+        tool = TOOLS.get(func_name)
+        if tool is not None:
+            tool_output = tool(**func_args)
         else:
             print(f"ERROR: Unknown function '{func_name}'")
             tool_output = None
@@ -136,14 +117,18 @@ def main():
         messages.append({
             "role": "tool",
             "name": func_name,
-            "content": json.dumps(tool_output, ensure_ascii=False),
+            "content": orjson.dumps(
+                _summarize_for_llm(tool_output),
+                default=str,
+                option=orjson.OPT_SERIALIZE_NUMPY,
+            ).decode(),
         })
 
-    # === 6) Send a follow-up chat to get the model's final answer ===
-    final_response: ChatResponse = chat(model=settings.model, messages=messages)
-
+    # === 6) Send a follow-up chat and stream the model's final answer as it is generated ===
     print("\n=== Final response from model: ===")
-    print(final_response.message.content)
+    for chunk in chat(model=settings.model, messages=messages, stream=True):
+        print(chunk.message.content or "", end="", flush=True)
+    print()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,300 @@
+import os
+import tempfile
+from collections.abc import Callable, Iterator
+from functools import lru_cache
+
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from app.settings import settings
+
+# Parquet schema metadata key holding the mtime of the CSV a copy was built from
+_SOURCE_MTIME_KEY = b"app.csv_mtime"
+
+
+def _source_mtime(parquet_path: str) -> float | None:
+    """
+    Returns the CSV mtime a Parquet copy was built from, or None if it can't be read.
+    """
+    try:
+        metadata = pq.read_schema(parquet_path).metadata or {}
+        return float(metadata[_SOURCE_MTIME_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+
+
+def ensure_parquet(csv_path: str) -> str:
+    """
+    Converts the CSV file to Parquet next to it, unless an up-to-date copy already exists.
+    The copy records the CSV's mtime and is rebuilt whenever that changes, even to an older time.
+
+    Args:
+        csv_path: Path to the source CSV file
+
+    Returns:
+        str: Path to the Parquet file (<csv_path>.parquet)
+    """
+    parquet_path = f"{csv_path}.parquet"
+    csv_mtime = os.path.getmtime(csv_path)
+    if _source_mtime(parquet_path) == csv_mtime:
+        return parquet_path
+
+    # Create the unique temporary file first, so concurrent runs never share a file,
+    # a half-written copy is never published and an unwritable directory fails
+    # before the CSV is parsed
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(parquet_path) or ".",
+        prefix=f".{os.path.basename(parquet_path)}.",
+        suffix=".tmp",
+    )
+    os.close(fd)
+    try:
+        # Parse with pandas so the copy keeps pandas' NA and dtype inference: pyarrow's own
+        # CSV reader turns blank strings into "" and date-like strings into date32.
+        # low_memory=False avoids mixed-type object columns, which Arrow can't store.
+        df = pd.read_csv(csv_path, encoding="utf-8", memory_map=True, low_memory=False)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {**table.schema.metadata, _SOURCE_MTIME_KEY: repr(csv_mtime).encode()}
+        )
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, parquet_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return parquet_path
+
+
+def _to_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts low-cardinality string columns to category dtype, so comparisons,
+    isin and groupby run on integer codes instead of python objects.
+    The categories are sorted and ordered, so min/max and sorting behave like
+    on the object column.
+    """
+    for col in df.columns:
+        if df[col].dtype == "object" and len(df) and df[col].nunique() / len(df) < 0.5:
+            try:
+                categories = sorted(df[col].dropna().unique())
+            except TypeError:
+                continue  # Mixed value types have no order - keep the object column
+            df[col] = df[col].astype(pd.CategoricalDtype(categories, ordered=True))
+    return df
+
+
+# (path, mtime) of CSV versions whose Parquet copy couldn't be written
+_unwritable: set[tuple[str, float]] = set()
+
+
+def _parquet_path(path: str) -> str | None:
+    """
+    Returns the up-to-date Parquet copy of a .csv file, or None if the file has
+    to be parsed with pandas (not a .csv, or the copy can't be written).
+    A failed write is only attempted and reported once per CSV version.
+    """
+    if not path.endswith(".csv"):
+        return None
+    key = (path, os.path.getmtime(path))
+    if key in _unwritable:
+        return None
+    try:
+        return ensure_parquet(path)
+    except OSError as e:
+        # e.g. a read-only data directory - fall back to parsing the CSV itself
+        print(f"⚠ Could not write Parquet copy of '{path}': {e}")
+        _unwritable.add(key)
+        return None
+
+
+@lru_cache(maxsize=4)
+def _load_df(
+    path: str,
+    mtime: float,  # noqa: ARG001 - only used as part of the cache key
+    columns: tuple[str, ...] | None,
+) -> pd.DataFrame:
+    """
+    Load the data file once per (path, mtime, columns) combination.
+
+    mtime is part of the cache key, so editing the file invalidates the cache.
+    .csv files are read from their Parquet copy; anything else, or a CSV whose
+    Parquet copy can't be written, is parsed with pandas.
+    Requested columns that don't exist in the file are skipped.
+    Low-cardinality string columns are returned as categoricals.
+    """
+    parquet_path = _parquet_path(path)
+    if parquet_path:
+        if columns is not None:
+            available = pq.read_schema(parquet_path).names
+            columns = [col for col in available if col in columns]
+        # Numpy-backed dtypes (not pd.ArrowDtype) so dtype checks and masks downstream keep working
+        df = pd.read_parquet(parquet_path, columns=columns)
+    else:
+        usecols = (lambda col: col in columns) if columns is not None else None
+        # memory_map lets the C parser skip an extra decode pass for UTF-8 files
+        df = pd.read_csv(
+            path, encoding="utf-8", memory_map=True, engine="c", usecols=usecols
+        )
+
+    return _to_categoricals(df)
+
+
+def load_df(columns: list[str] | set[str] | None = None) -> pd.DataFrame:
+    """
+    Returns the cached DataFrame for settings.csv_path.
+
+    Args:
+        columns: Only load these columns (all columns if None)
+
+    The frame is shared between callers, so it must not be modified in place.
+    """
+    path = settings.csv_path
+    if columns is not None:
+        columns = tuple(sorted(columns))
+    return _load_df(path, os.path.getmtime(path), columns)
+
+
+def scan_df(
+    columns: list[str] | set[str] | None,
+    make_filter: Callable[[set[str]], pc.Expression | None],
+) -> pd.DataFrame | None:
+    """
+    Reads settings.csv_path's Parquet copy with the row filter pushed into the scan,
+    so only matching rows of the requested columns are converted to pandas. Nothing is cached.
+
+    Args:
+        columns: Only read these columns (all columns if None); missing ones are skipped
+        make_filter: Builds the Arrow filter expression from the file's column names
+
+    Returns:
+        The filtered DataFrame, or None if there is no Parquet copy to scan
+    """
+    parquet_path = _parquet_path(settings.csv_path)
+    if parquet_path is None:
+        return None
+
+    available = pq.read_schema(parquet_path).names
+    if columns is not None:
+        columns = [col for col in available if col in columns]
+    table = pq.read_table(
+        parquet_path, columns=columns, filters=make_filter(set(available))
+    )
+    return table.to_pandas()
+
+
+def iter_batches(
+    columns: list[str] | set[str], batch_size: int = 65_536
+) -> Iterator[pd.DataFrame]:
+    """
+    Yields settings.csv_path in chunks of up to batch_size rows, so callers can
+    aggregate without holding the whole file in memory. Nothing is cached.
+
+    Args:
+        columns: Only read these columns; columns not in the file are skipped
+        batch_size: Maximum number of rows per chunk
+    """
+    path = settings.csv_path
+    parquet_path = _parquet_path(path)
+    if parquet_path:
+        parquet_file = pq.ParquetFile(parquet_path)
+        columns = [col for col in parquet_file.schema_arrow.names if col in columns]
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            path,
+            encoding="utf-8",
+            memory_map=True,
+            engine="c",
+            usecols=lambda col: col in columns,
+            chunksize=batch_size,
+        )
+
+
+def get_csv_schema() -> dict:
+    """
+    Returns schema information about the CSV file including:
+    - Column names and types
+    - For string columns: unique values
+    - For numeric columns: min/max values
+    """
+    df = load_df()
+    schema = {}
+
+    # min/max/mean as frame-wide vectorized reductions instead of per-column calls.
+    # min/max run per dtype, since a mixed int/float result would upcast large ints to float.
+    numeric_cols = [
+        col
+        for col in df.columns
+        if df[col].dtype in ["int64", "float64", "int32", "float32"]
+    ]
+    mins, maxs = {}, {}
+    for dtype in {df[col].dtype for col in numeric_cols}:
+        same_dtype = df[[col for col in numeric_cols if df[col].dtype == dtype]]
+        mins.update(same_dtype.min().items())
+        maxs.update(same_dtype.max().items())
+    means = df[numeric_cols].mean().to_dict()
+
+    for col in df.columns:
+        dtype = df[col].dtype
+        col_info = {
+            # Categoricals are a loading detail - report the type of their values
+            "type": str(dtype.categories.dtype if dtype.name == "category" else dtype),
+        }
+
+        # For string/object/categorical columns - get unique values
+        if df[col].dtype.name in ("object", "string", "category"):
+            unique_vals = df[col].dropna().unique().tolist()
+            # Limit to reasonable number of unique values
+            if len(unique_vals) <= 50:
+                col_info["unique_values"] = unique_vals
+            else:
+                col_info["unique_count"] = len(unique_vals)
+                col_info["sample_values"] = unique_vals[:10]  # Show first 10 as sample
+
+        # For numeric columns - get min/max/mean
+        elif col in means:
+            col_info["min"] = mins[col]
+            col_info["max"] = maxs[col]
+            col_info["mean"] = round(means[col], 2)
+
+        schema[col] = col_info
+
+    return schema
+
+
+def get_schema_and_rows() -> tuple[dict, int]:
+    """
+    Returns (get_csv_schema(), total row count) for settings.csv_path.
+
+    Both are computed from one load and cached to <csv_path>.schema.json, keyed by
+    the CSV's mtime, so later runs don't need to load the data at all.
+    """
+    path = settings.csv_path
+    mtime = os.path.getmtime(path)
+    cache_path = f"{path}.schema.json"
+
+    try:
+        with open(cache_path, "rb") as f:
+            cached = orjson.loads(f.read())
+        if cached["mtime"] == mtime:
+            return cached["schema"], cached["total_rows"]
+    except (OSError, orjson.JSONDecodeError, KeyError, TypeError):
+        pass
+
+    payload = orjson.dumps(
+        {"mtime": mtime, "schema": get_csv_schema(), "total_rows": len(load_df())},
+        default=str,
+        option=orjson.OPT_SERIALIZE_NUMPY,
+    )
+    try:
+        with open(cache_path, "wb") as f:
+            f.write(payload)
+    except OSError:
+        pass  # The cache is only an optimization
+
+    # Decode the payload, so cold and warm runs return exactly the same values
+    cached = orjson.loads(payload)
+    return cached["schema"], cached["total_rows"]
@@ -9,6 +9,7 @@ class Settings(BaseSettings):
 
     model: str = "qwen3:8b"
     csv_path: str = "data/data.csv"
+    model_cache_ttl: int = 3600  # seconds to trust a cached "model is available" check
 
     @field_validator("env")
     def validate_env(cls, v: str) -> str:
@@ -1,7 +1,371 @@
+import operator
+import os
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from app.data import get_schema_and_rows, iter_batches, load_df, scan_df
 from app.settings import settings
 
 
+def _as_list(columns: str | list[str] | None) -> list[str] | None:
+    """
+    Accepts a bare column name where a list is expected, as models often send one.
+    """
+    return [columns] if isinstance(columns, str) else columns
+
+
+def _isin(values, operand) -> np.ndarray:
+    operand_array = np.asarray(operand)
+    if (
+        isinstance(values, np.ndarray)
+        and values.dtype.kind in "iuf"
+        and operand_array.dtype.kind in "iuf"
+    ):
+        # Numeric columns: np.isin beats hashing for the short lists the model sends
+        return np.isin(values, operand_array)
+    # Hash-based membership test, safe for object/categorical columns with missing values
+    return pd.Series(values, copy=False).isin(operand).to_numpy()
+
+
+def _ordering(compare):
+    """
+    Wraps an ordering comparison so it also works on categoricals, comparing their
+    values like the equivalent object column would. Ordered categoricals alone only
+    accept operands that are one of their categories.
+    """
+
+    def op(values, operand) -> np.ndarray:
+        if not isinstance(values, pd.Categorical):
+            return compare(values, operand)
+        # Compare each category once, then map the result back through the codes
+        codes = values.codes
+        mask = np.zeros(len(codes), dtype=bool)
+        if len(values.categories):
+            hits = compare(np.asarray(values.categories, dtype=object), operand)
+            mask = np.asarray(hits, dtype=bool)[codes] & (codes >= 0)
+        return mask
+
+    return op
+
+
+# WHERE operators, each mapping (column values, operand) to a boolean mask
+_OPS = {
+    "$lt": _ordering(operator.lt),
+    "$lte": _ordering(operator.le),
+    "$gt": _ordering(operator.gt),
+    "$gte": _ordering(operator.ge),
+    "$ne": operator.ne,
+    "$eq": operator.eq,
+    "$in": _isin,
+    "$nin": lambda values, operand: ~_isin(values, operand),
+}
+
+# Aggregation functions supported in the agg argument, mapped to their pandas names
+_AGGS = {
+    "mean": "mean",
+    "count": "count",
+    "sum": "sum",
+    "min": "min",
+    "max": "max",
+    "std": "std",
+}
+
+
+def _agg_funcs(funcs: str | list[str]) -> list[str]:
+    """
+    Normalizes one agg entry to a list of unique, supported function names.
+    """
+    if isinstance(funcs, str):
+        funcs = [funcs]
+    return [func for func in dict.fromkeys(funcs) if func in _AGGS]
+
+
+# Comparison operators as ufuncs, so numeric predicates can write into a reused buffer
+_UFUNCS = {
+    "$lt": np.less,
+    "$lte": np.less_equal,
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$ne": np.not_equal,
+    "$eq": np.equal,
+}
+
+
+def _numeric_mask(
+    predicates: list[tuple[np.ndarray, str, int | float]], size: int
+) -> np.ndarray:
+    """
+    Evaluates numeric (values, operator, operand) predicates into a single mask,
+    each ufunc writing into one reused buffer instead of a new array.
+    """
+    mask = np.ones(size, dtype=bool)
+    scratch = np.empty(size, dtype=bool)
+    for values, op, operand in predicates:
+        _UFUNCS[op](values, operand, out=scratch)
+        mask &= scratch
+    return mask
+
+
+def _build_mask(df: pd.DataFrame, where: dict) -> np.ndarray:
+    """
+    Combines all WHERE conditions into a single boolean mask over df's rows.
+    Conditions on columns that aren't in df are ignored.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    numeric = []
+    for col, value in where.items():
+        if col not in df.columns:
+            continue
+        values = df[col].values
+        if isinstance(value, dict):
+            # Handle comparison operators
+            for op, operand in value.items():
+                if op not in _OPS:
+                    print(f"Warning: Unsupported operator '{op}' for column '{col}'")
+                    continue
+                if (
+                    op in _UFUNCS
+                    and values.dtype.kind in "if"
+                    and isinstance(operand, (int, float))
+                    and not isinstance(operand, bool)
+                ):
+                    # Numeric comparisons are evaluated together below
+                    numeric.append((values, op, operand))
+                else:
+                    mask &= _OPS[op](values, operand)
+        elif isinstance(value, list):
+            mask &= _OPS["$in"](values, value)
+        else:
+            mask &= _OPS["$eq"](values, value)
+
+    if numeric:
+        mask &= _numeric_mask(numeric, len(df))
+    return mask
+
+
+# The WHERE operators as Arrow expressions. Arrow comparisons with null are null (row dropped),
+# so $ne/$nin keep nulls explicitly to match the pandas semantics in _OPS.
+_ARROW_OPS = {
+    "$lt": lambda field, operand: field < operand,
+    "$lte": lambda field, operand: field <= operand,
+    "$gt": lambda field, operand: field > operand,
+    "$gte": lambda field, operand: field >= operand,
+    "$ne": lambda field, operand: (field != operand) | field.is_null(),
+    "$eq": lambda field, operand: field == operand,
+    "$in": lambda field, operand: field.isin(operand),
+    "$nin": lambda field, operand: ~field.isin(operand) | field.is_null(),
+}
+
+
+def _arrow_filter(where: dict | None, available: set[str]) -> pc.Expression | None:
+    """
+    Translates the WHERE conditions into one Arrow filter expression, the
+    counterpart of _build_mask for scans. Returns None if nothing is filtered.
+    """
+    terms = []
+    for col, value in (where or {}).items():
+        if col not in available:
+            continue
+        field = pc.field(col)
+        if isinstance(value, dict):
+            for op, operand in value.items():
+                if op not in _ARROW_OPS:
+                    print(f"Warning: Unsupported operator '{op}' for column '{col}'")
+                    continue
+                terms.append(_ARROW_OPS[op](field, operand))
+        elif isinstance(value, list):
+            terms.append(_ARROW_OPS["$in"](field, value))
+        else:
+            terms.append(_ARROW_OPS["$eq"](field, value))
+
+    if not terms:
+        return None
+    expr = terms[0]
+    for term in terms[1:]:
+        expr &= term
+    return expr
+
+
+def _filtered_df(columns: set[str] | None, where: dict | None) -> pd.DataFrame:
+    """
+    Returns the rows matching where, limited to columns.
+
+    Filters are pushed down into the Parquet scan when possible. Without a Parquet
+    copy, or when Arrow can't evaluate a condition (e.g. a type mismatch or an int
+    operand beyond int64), the cached frame is filtered with _build_mask instead.
+    """
+    if where:
+        try:
+            df = scan_df(columns, lambda available: _arrow_filter(where, available))
+            if df is not None:
+                return df
+        except (pa.ArrowException, TypeError, ValueError, OverflowError):
+            pass
+
+    df = load_df(columns=columns)
+    return df[_build_mask(df, where)] if where else df
+
+
+@lru_cache(maxsize=1)
+def _column_set(
+    path: str,  # noqa: ARG001 - only used as part of the cache key
+    mtime: float,  # noqa: ARG001 - only used as part of the cache key
+) -> frozenset[str]:
+    """
+    Column names from the cached schema, so queries can be validated without loading data.
+    """
+    return frozenset(get_schema_and_rows()[0])
+
+
+def _is_invalid_query(
+    select: str | list[str] | None,
+    where: dict | None,
+    group_by: str | list[str] | None,
+    agg: dict | None,
+    sort_by: str | None,
+) -> bool:
+    """
+    Returns True if a query is malformed or references columns that don't exist in the CSV.
+    For aggregations, sort_by may also name an output column like "Earnings_USD_mean".
+    """
+    select, group_by = _as_list(select), _as_list(group_by)
+    if not all(
+        [
+            isinstance(select or [], list),
+            isinstance(group_by or [], list),
+            isinstance(where or {}, dict),
+            isinstance(agg or {}, dict),
+            isinstance(sort_by or "", str),
+        ]
+    ):
+        return True
+
+    path = settings.csv_path
+    columns = _column_set(path, os.path.getmtime(path))
+    referenced = (select or []) + list(where or {}) + (group_by or []) + list(agg or {})
+    if any(not isinstance(col, str) or col not in columns for col in referenced):
+        return True
+
+    if sort_by and sort_by not in columns:
+        agg_outputs = {
+            f"{col}_{func}"
+            for col, funcs in (agg or {}).items()
+            for func in _agg_funcs(funcs)
+        }
+        return sort_by not in agg_outputs
+    return False
+
+
+def _needed_columns(
+    select: list[str] | None,
+    where: dict | None,
+    group_by: list[str] | None,
+    agg: dict | None,
+    sort_by: str | None,
+) -> set[str] | None:
+    """
+    Returns the set of columns a query touches, or None if it needs all of them.
+    """
+    if not agg and not select:
+        return None
+
+    needed = set(where or {}) | set(agg or {})
+    if agg:
+        needed |= set(group_by or [])
+    else:
+        needed |= set(select)
+    if sort_by:
+        needed.add(sort_by)
+    return needed
+
+
+def _update_agg_state(state: dict, series: pd.Series) -> None:
+    """
+    Folds one chunk of a column into its running aggregate state.
+    Only the statistics listed in state["funcs"] are computed, like pandas would.
+    """
+    values = series.dropna()
+    n = len(values)
+    if not n:
+        return
+    funcs = state["funcs"]
+
+    if funcs & {"sum", "mean", "std"}:
+        chunk_sum = values.sum()
+        if "std" in funcs:
+            # Chan et al. pairwise update of the sum of squared deviations
+            chunk_m2 = ((values - chunk_sum / n) ** 2).sum()
+            if state["n"]:
+                delta = chunk_sum / n - state["sum"] / state["n"]
+                chunk_m2 += delta**2 * state["n"] * n / (state["n"] + n)
+            state["m2"] += chunk_m2
+        state["sum"] += chunk_sum
+    if "min" in funcs:
+        chunk_min = values.min()
+        state["min"] = (
+            chunk_min if state["min"] is None else min(state["min"], chunk_min)
+        )
+    if "max" in funcs:
+        chunk_max = values.max()
+        state["max"] = (
+            chunk_max if state["max"] is None else max(state["max"], chunk_max)
+        )
+    state["n"] += n
+
+
+def _final_agg_value(state: dict, func: str):
+    n = state["n"]
+    if func == "count":
+        return n
+    if func == "sum":
+        return state["sum"]
+    if func == "mean":
+        return state["sum"] / n if n else np.nan
+    if func == "std":
+        return np.sqrt(state["m2"] / (n - 1)) if n > 1 else np.nan
+    return state[func] if state[func] is not None else np.nan
+
+
+def _streamed_agg(agg: dict, where: dict | None) -> pd.DataFrame:
+    """
+    Computes aggregations without grouping by streaming the data in chunks,
+    so memory use is bounded by the chunk size rather than the file size.
+    """
+    specs = {col: _agg_funcs(funcs) for col, funcs in agg.items()}
+
+    states = {}
+    for chunk in iter_batches(columns=set(specs) | set(where or {})):
+        if where:
+            chunk = chunk[_build_mask(chunk, where)]
+        for col, funcs in specs.items():
+            if col in chunk.columns:
+                state = states.setdefault(
+                    col,
+                    {
+                        "funcs": set(funcs),
+                        "n": 0,
+                        "sum": 0,
+                        "m2": 0.0,
+                        "min": None,
+                        "max": None,
+                    },
+                )
+                _update_agg_state(state, chunk[col])
+
+    # Columns that aren't in the file are skipped
+    return pd.DataFrame(
+        {
+            f"{col}_{func}": [_final_agg_value(states[col], func)]
+            for col, funcs in specs.items()
+            if col in states
+            for func in funcs
+        }
+    )
+
+
 def query_csv_data(
     select: list[str] = None,
     where: dict = None,
@@ -25,105 +389,101 @@ def query_csv_data(
         sort_desc: Sort in descending order
 
     Returns:
-        List of dictionaries with query results
+        List of dictionaries with query results, or an empty list if the query is
+        malformed or references columns that don't exist
     """
+    select, group_by = _as_list(select), _as_list(group_by)
 
-    df = pd.read_csv(settings.csv_path, encoding="utf-8")
+    # Reject malformed calls from the model before touching the data
+    if _is_invalid_query(select, where, group_by, agg, sort_by):
+        return []
 
-    # Apply WHERE filtering
-    if where:
-        for col, value in where.items():
-            if col in df.columns:
-                if isinstance(value, dict):
-                    # Handle comparison operators
-                    for operator, operand in value.items():
-                        if operator == "$lt":
-                            df = df[df[col] < operand]
-                        elif operator == "$lte":
-                            df = df[df[col] <= operand]
-                        elif operator == "$gt":
-                            df = df[df[col] > operand]
-                        elif operator == "$gte":
-                            df = df[df[col] >= operand]
-                        elif operator == "$ne":
-                            df = df[df[col] != operand]
-                        elif operator == "$eq":
-                            df = df[df[col] == operand]
-                        elif operator == "$in":
-                            df = df[df[col].isin(operand)]
-                        elif operator == "$nin":
-                            df = df[~df[col].isin(operand)]
-                        else:
-                            print(
-                                f"Warning: Unsupported operator '{operator}' for column '{col}'"
-                            )
-                elif isinstance(value, list):
-                    df = df[df[col].isin(value)]
-                else:
-                    df = df[df[col] == value]
-
-    # Handle GROUP BY with aggregations
-    if group_by and agg:
-        # Group by specified columns
-        grouped = df.groupby(group_by)
-
-        # Apply aggregations
-        agg_results = {}
-        for col, funcs in agg.items():
-            if col in df.columns:
-                if isinstance(funcs, str):
-                    funcs = [funcs]
-                for func in funcs:
-                    if func == "mean":
-                        agg_results[f"{col}_mean"] = grouped[col].mean()
-                    elif func == "count":
-                        agg_results[f"{col}_count"] = grouped[col].count()
-                    elif func == "sum":
-                        agg_results[f"{col}_sum"] = grouped[col].sum()
-                    elif func == "min":
-                        agg_results[f"{col}_min"] = grouped[col].min()
-                    elif func == "max":
-                        agg_results[f"{col}_max"] = grouped[col].max()
-                    elif func == "std":
-                        agg_results[f"{col}_std"] = grouped[col].std()
-
-        # Combine results
-        result_df = pd.DataFrame(agg_results).reset_index()
-
-    # Handle simple aggregations without grouping
-    elif agg and not group_by:
-        agg_results = {}
-        for col, funcs in agg.items():
-            if col in df.columns:
-                if isinstance(funcs, str):
-                    funcs = [funcs]
-                for func in funcs:
-                    if func == "mean":
-                        agg_results[f"{col}_mean"] = [df[col].mean()]
-                    elif func == "count":
-                        agg_results[f"{col}_count"] = [df[col].count()]
-                    elif func == "sum":
-                        agg_results[f"{col}_sum"] = [df[col].sum()]
-                    elif func == "min":
-                        agg_results[f"{col}_min"] = [df[col].min()]
-                    elif func == "max":
-                        agg_results[f"{col}_max"] = [df[col].max()]
-                    elif func == "std":
-                        agg_results[f"{col}_std"] = [df[col].std()]
-
-        result_df = pd.DataFrame(agg_results)
+    # Handle simple aggregations without grouping - no need to materialize the frame
+    if agg and not group_by:
+        result_df = _streamed_agg(agg, where)
 
     else:
-        # Regular selection and filtering
-        result_df = df
-        if select:
-            missing_cols = [col for col in select if col not in df.columns]
-            if missing_cols:
-                return []
-            result_df = result_df[select]
+        # Only the referenced columns and matching rows are decoded
+        df = _filtered_df(_needed_columns(select, where, group_by, agg, sort_by), where)
+
+        if agg:
+            final_cols = list(dict.fromkeys(group_by + list(agg)))
+            final_cols = [col for col in final_cols if col in df.columns]
+        else:
+            final_cols = select or list(df.columns)
+        df = df[final_cols]
+
+        # Handle GROUP BY with aggregations
+        if group_by and agg:
+            # Group by specified columns
+            grouped = df.groupby(group_by, observed=True)
+
+            # Apply all aggregations in one agg call, a single pass over the groups per column
+            spec = {
+                col: [_AGGS[func] for func in _agg_funcs(funcs)]
+                for col, funcs in agg.items()
+                if col in df.columns and _agg_funcs(funcs)
+            }
+            if spec:
+                result_df = grouped.agg(spec)
+                result_df.columns = [f"{col}_{func}" for col, func in result_df.columns]
+                result_df = result_df.reset_index()
+            else:
+                result_df = pd.DataFrame().reset_index()
+
+        else:
+            # Regular selection and filtering
+            result_df = df
 
     # Apply sorting
     if sort_by and sort_by in result_df.columns:
         result_df = result_df.sort_values(sort_by, ascending=not sort_desc)
 
     return result_df.to_dict(orient="records")
+
+
+# Tools the model may call, by function name
+TOOLS = {
+    "query_csv_data": query_csv_data,
+}
+
+
+# Spec of query_csv_data that the model sees in ollama.chat
+QUERY_CSV_DATA_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "query_csv_data",
+        "description": "Queries and analyzes CSV data with filtering, grouping, and aggregation capabilities.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "select": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": 'List of columns to select, e.g. ["Freelancer_ID", "Job_Category"]',
+                },
+                "where": {
+                    "type": "object",
+                    "description": 'Filter conditions. Supports equality: {"Platform": "Fiverr"}, lists: {"Platform": ["Fiverr", "Upwork"]}, and operators: {"Job_Completed": {"$lt": 100}, "Earnings_USD": {"$gte": 5000}}. Operators: $lt, $lte, $gt, $gte, $ne, $eq, $in, $nin',
+                },
+                "group_by": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": 'Columns to group by, e.g. ["Payment_Method", "Platform"]',
+                },
+                "agg": {
+                    "type": "object",
+                    "description": 'Aggregation functions, e.g. {"Marketing_Spent": ["mean", "count"], "Job_Completed": "sum"}',
+                },
+                "sort_by": {
+                    "type": "string",
+                    "description": "Column name to sort results by",
+                },
+                "sort_desc": {
+                    "type": "boolean",
+                    "description": "Sort in descending order (default: false)",
+                },
+            },
+        },
+    },
+}
@@ -1,12 +1,42 @@
 from ollama import list as ollama_list, pull as ollama_pull
-import pandas as pd
 from app.settings import settings
+import os
 import time
 
+MODEL_CACHE_PATH = os.path.expanduser("~/.cache/app/model_ok")
+
+
+def _is_model_cached(model_name: str) -> bool:
+    """
+    Returns True if the model was confirmed available less than settings.model_cache_ttl seconds ago.
+    """
+    try:
+        with open(MODEL_CACHE_PATH, encoding="utf-8") as f:
+            cached_model, _, checked_at = f.read().strip().rpartition(":")
+        return (
+            cached_model == model_name
+            and time.time() - float(checked_at) < settings.model_cache_ttl
+        )
+    except (OSError, ValueError):
+        return False
+
+
+def _cache_model(model_name: str) -> None:
+    """
+    Records that the model is available, so the next runs can skip the ollama RPC.
+    """
+    try:
+        os.makedirs(os.path.dirname(MODEL_CACHE_PATH), exist_ok=True)
+        with open(MODEL_CACHE_PATH, "w", encoding="utf-8") as f:
+            f.write(f"{model_name}:{time.time()}")
+    except OSError:
+        pass  # The cache is only an optimization
+
 
 def check_and_pull_model(model_name: str) -> bool:
     """
     Check if the specified model exists locally, and pull it if it doesn't.
+    A successful check is cached on disk for settings.model_cache_ttl seconds.
 
     Args:
         model_name: Name of the model to check/pull
@@ -14,6 +44,10 @@ def check_and_pull_model(model_name: str) -> bool:
     Returns:
         bool: True if model is available, False if failed to pull
     """
+    if _is_model_cached(model_name):
+        print(f"✓ Model '{model_name}' is already available locally (cached)")
+        return True
+
     try:
         # Get list of available models
         models = ollama_list()
@@ -24,6 +58,7 @@ def check_and_pull_model(model_name: str) -> bool:
 
         if model_exists:
             print(f"✓ Model '{model_name}' is already available locally")
+            _cache_model(model_name)
             return True
         else:
             print(
@@ -35,9 +70,17 @@ def check_and_pull_model(model_name: str) -> bool:
 
             # The pull function returns a generator, so we need to consume it
             print("Downloading model (this may take a while)...")
+            last_print = 0.0
+            last_status = None
             for chunk in pull_response:
                 if "status" in chunk:
                     status = chunk["status"]
+                    # Redraw at most 20 times per second, but never miss a status change
+                    now = time.monotonic()
+                    if status == last_status and now - last_print < 0.05:
+                        continue
+                    last_print, last_status = now, status
+
                     if "total" in chunk and "completed" in chunk:
                         total = chunk["total"]
                         completed = chunk["completed"]
@@ -47,6 +90,7 @@ def check_and_pull_model(model_name: str) -> bool:
                         print(f"\r{status}", end="", flush=True)
 
             print(f"\n✓ Model '{model_name}' pulled successfully!")
+            _cache_model(model_name)
             return True
 
     except Exception as e:
@@ -87,39 +131,3 @@ def wait_for_ollama_connection(max_retries: int = 30, delay: int = 2) -> bool:
     print("✗ Failed to connect to Ollama after maximum retries")
     print("Please ensure Ollama is running and accessible")
     return False
-
-
-def get_csv_schema() -> dict:
-    """
-    Returns schema information about the CSV file including:
-    - Column names and types
-    - For string columns: unique values
-    - For numeric columns: min/max values
-    """
-    df = pd.read_csv(settings.csv_path, encoding="utf-8")
-    schema = {}
-
-    for col in df.columns:
-        col_info = {
-            "type": str(df[col].dtype),
-        }
-
-        # For string/object columns - get unique values
-        if df[col].dtype == "object" or df[col].dtype.name == "string":
-            unique_vals = df[col].dropna().unique().tolist()
-            # Limit to reasonable number of unique values
-            if len(unique_vals) <= 50:
-                col_info["unique_values"] = unique_vals
-            else:
-                col_info["unique_count"] = len(unique_vals)
-                col_info["sample_values"] = unique_vals[:10]  # Show first 10 as sample
-
-        # For numeric columns - get min/max/mean
-        elif df[col].dtype in ["int64", "float64", "int32", "float32"]:
-            col_info["min"] = df[col].min()
-            col_info["max"] = df[col].max()
-            col_info["mean"] = round(df[col].mean(), 2)
-
-        schema[col] = col_info
-
-    return schema
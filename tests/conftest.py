@@ -0,0 +1,56 @@
+import os
+
+import pandas as pd
+import pytest
+
+# app.settings requires ENV at import time
+os.environ.setdefault("ENV", "local")
+
+from app.settings import settings  # noqa: E402
+
+PLATFORMS = ["Fiverr", "Upwork", "Toptal", "", "NA"]
+DATES = ["2024-01-02", "2024-03-15", "2024-04-01", "2024-06-30"]
+
+
+def make_rows(n: int = 60) -> pd.DataFrame:
+    """
+    Rows with blank and "NA" platforms (missing in pandas) and a date-like string column.
+    """
+    return pd.DataFrame(
+        {
+            "Freelancer_ID": [f"FL{i:03d}" for i in range(n)],
+            "Platform": [PLATFORMS[i % len(PLATFORMS)] for i in range(n)],
+            "Date": [DATES[i % len(DATES)] for i in range(n)],
+            "Job_Completed": [(i * 7) % 50 for i in range(n)],
+            "Earnings_USD": [100 + (i * 37) % 900 for i in range(n)],
+        }
+    )
+
+
+@pytest.fixture(params=["csv", "txt", "no_parquet"])
+def data_path(request, tmp_path, monkeypatch):
+    """
+    Points settings.csv_path at a sample file, read through each loader path:
+    the Parquet copy, a non-.csv file, and a .csv whose Parquet copy can't be written.
+    """
+    suffix = "txt" if request.param == "txt" else "csv"
+    path = tmp_path / f"data.{suffix}"
+    make_rows().to_csv(path, index=False)
+    monkeypatch.setattr(settings, "csv_path", str(path))
+
+    if request.param == "no_parquet":
+        import app.data
+
+        def unwritable(csv_path):
+            raise PermissionError(13, "Permission denied", f"{csv_path}.parquet")
+
+        monkeypatch.setattr(app.data, "ensure_parquet", unwritable)
+    return str(path)
+
+
+@pytest.fixture
+def reference(data_path) -> pd.DataFrame:
+    """
+    The sample file as plain pandas reads it - the behaviour queries must match.
+    """
+    return pd.read_csv(data_path, encoding="utf-8")
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+from conftest import make_rows
+
+import app.data
+from app.data import ensure_parquet, get_csv_schema, get_schema_and_rows
+from app.settings import settings
+from app.tools import query_csv_data
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "data.csv"
+    make_rows().to_csv(path, index=False)
+    return str(path)
+
+
+def test_parquet_copy_is_reused(csv_path):
+    parquet_path = ensure_parquet(csv_path)
+    written_at = os.path.getmtime(parquet_path)
+
+    assert ensure_parquet(csv_path) == parquet_path
+    assert os.path.getmtime(parquet_path) == written_at
+
+
+def test_parquet_copy_follows_older_csv(csv_path):
+    parquet_path = ensure_parquet(csv_path)
+
+    # Replace the CSV with different data and an older mtime, like `cp -p` or a restore
+    make_rows(10).to_csv(csv_path, index=False)
+    os.utime(csv_path, (1_000_000_000, 1_000_000_000))
+    ensure_parquet(csv_path)
+
+    assert app.data.pq.read_metadata(parquet_path).num_rows == 10
+
+
+def test_failed_write_leaves_no_files(csv_path, monkeypatch):
+    def fail(*_args, **_kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(app.data.pq, "write_table", fail)
+    with pytest.raises(OSError):
+        ensure_parquet(csv_path)
+
+    assert os.listdir(os.path.dirname(csv_path)) == ["data.csv"]
+
+
+def test_schema_keeps_large_integers_exact(tmp_path, monkeypatch):
+    path = tmp_path / "data.csv"
+    path.write_text("Big_ID,Rate\n9007199254740993,1.5\n9007199254740995,2.5\n")
+    monkeypatch.setattr(settings, "csv_path", str(path))
+
+    schema = get_csv_schema()
+
+    assert schema["Big_ID"]["min"] == 9007199254740993
+    assert schema["Big_ID"]["max"] == 9007199254740995
+    assert schema["Rate"] == {"type": "float64", "min": 1.5, "max": 2.5, "mean": 2.0}
+
+
+def test_unwritable_copy_is_attempted_once(csv_path, monkeypatch, capsys):
+    def read_only(*_args, **_kwargs):
+        raise PermissionError(13, "Permission denied")
+
+    parses = []
+    read_csv = app.data.pd.read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        parses.append(args[0])
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(app.data.tempfile, "mkstemp", read_only)
+    monkeypatch.setattr(app.data.pd, "read_csv", counting_read_csv)
+    monkeypatch.setattr(settings, "csv_path", csv_path)
+    get_schema_and_rows()  # Loaded before any query, like main() does
+    parses.clear()
+
+    result = query_csv_data(select=["Freelancer_ID"], where={"Job_Completed": 7})
+    assert result == [{"Freelancer_ID": "FL001"}, {"Freelancer_ID": "FL051"}]
+    assert len(parses) == 1
+
+    query_csv_data(agg={"Earnings_USD": "sum"}, where={"Job_Completed": {"$gt": 40}})
+    assert capsys.readouterr().out.count("Could not write Parquet copy") == 1
@@ -0,0 +1,150 @@
+import math
+
+import pytest
+
+from app.data import get_schema_and_rows
+from app.tools import query_csv_data
+
+
+def test_missing_strings_are_not_a_group(reference):
+    result = query_csv_data(group_by=["Platform"], agg={"Earnings_USD": "count"})
+
+    expected = reference.groupby("Platform")["Earnings_USD"].count().to_dict()
+    assert {row["Platform"]: row["Earnings_USD_count"] for row in result} == expected
+    assert "" not in expected
+
+
+def test_count_skips_missing_strings(reference):
+    result = query_csv_data(agg={"Platform": "count"})
+
+    assert result == [{"Platform_count": reference["Platform"].count()}]
+
+
+def test_blank_string_matches_nothing(data_path):  # noqa: ARG001 - fixture sets the path
+    assert query_csv_data(select=["Freelancer_ID"], where={"Platform": ""}) == []
+
+
+def test_date_strings_compare_as_strings(reference):
+    result = query_csv_data(select=["Freelancer_ID"], where={"Date": "2024-01-02"})
+    streamed = query_csv_data(where={"Date": "2024-01-02"}, agg={"Date": "count"})
+
+    expected = (reference["Date"] == "2024-01-02").sum()
+    assert len(result) == expected > 0
+    assert streamed == [{"Date_count": expected}]
+
+
+def test_schema_lists_only_real_values(reference):
+    schema, total_rows = get_schema_and_rows()
+
+    assert total_rows == len(reference)
+    assert set(schema["Platform"]["unique_values"]) == {"Fiverr", "Upwork", "Toptal"}
+    assert schema["Date"]["unique_values"] == sorted(reference["Date"].unique())
+
+
+def test_aggregates_match_pandas(reference):
+    result = query_csv_data(
+        where={"Job_Completed": {"$gte": 10}},
+        agg={"Earnings_USD": ["mean", "std", "min", "max", "sum"]},
+    )
+
+    filtered = reference.loc[reference["Job_Completed"] >= 10, "Earnings_USD"]
+    row = result[0]
+    assert math.isclose(row["Earnings_USD_mean"], filtered.mean())
+    assert math.isclose(row["Earnings_USD_std"], filtered.std())
+    assert row["Earnings_USD_min"] == filtered.min()
+    assert row["Earnings_USD_max"] == filtered.max()
+    assert row["Earnings_USD_sum"] == filtered.sum()
+
+
+def test_string_ordering_predicates(reference):
+    platform = query_csv_data(
+        select=["Freelancer_ID"], where={"Platform": {"$lte": "Toptal"}}
+    )
+    date = query_csv_data(
+        select=["Freelancer_ID"],
+        where={"Date": {"$gte": "2024-04-01", "$lt": "2024-07"}},
+    )
+
+    assert len(platform) == (reference["Platform"] <= "Toptal").sum()
+    assert (
+        len(date)
+        == ((reference["Date"] >= "2024-04-01") & (reference["Date"] < "2024-07")).sum()
+    )
+
+
+def test_grouped_min_max_on_strings(reference):
+    result = query_csv_data(group_by=["Platform"], agg={"Date": ["min", "max"]})
+
+    expected = reference.groupby("Platform")["Date"].agg(["min", "max"])
+    assert {row["Platform"]: (row["Date_min"], row["Date_max"]) for row in result} == {
+        platform: tuple(values) for platform, values in expected.iterrows()
+    }
+
+
+def test_schema_reports_value_types(data_path):  # noqa: ARG001 - fixture sets the path
+    schema, _ = get_schema_and_rows()
+
+    assert schema["Platform"]["type"] == "object"
+    assert schema["Date"]["type"] == "object"
+    assert schema["Earnings_USD"]["type"] == "int64"
+
+
+def test_group_by_accepts_a_bare_column(reference):
+    as_string = query_csv_data(group_by="Platform", agg={"Earnings_USD": "sum"})
+    as_list = query_csv_data(group_by=["Platform"], agg={"Earnings_USD": "sum"})
+
+    assert as_string == as_list
+    assert len(as_string) == reference["Platform"].nunique()
+
+
+def test_select_accepts_a_bare_column(reference):
+    assert query_csv_data(select="Freelancer_ID") == reference[
+        ["Freelancer_ID"]
+    ].to_dict(orient="records")
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"select": ["Nope"]},
+        {"where": {"Nope": 1}, "agg": {"Earnings_USD": "sum"}},
+        {"group_by": "Nope", "agg": {"Earnings_USD": "sum"}},
+        {"group_by": ["Platform"], "agg": {"Earnings_USD": "sum"}, "sort_by": "Nope"},
+        {"where": ["Platform"]},
+        {"agg": ["Earnings_USD"]},
+        {"select": [["Platform"]]},
+        {"sort_by": ["Platform"]},
+    ],
+)
+def test_malformed_queries_return_nothing(data_path, query):  # noqa: ARG001
+    assert query_csv_data(**query) == []
+
+
+def test_numeric_predicates_are_combined(reference):
+    result = query_csv_data(
+        select=["Freelancer_ID"],
+        where={"Job_Completed": {"$gt": 5, "$lte": 40}, "Earnings_USD": {"$ne": 137}},
+    )
+
+    expected = reference[
+        (reference["Job_Completed"] > 5)
+        & (reference["Job_Completed"] <= 40)
+        & (reference["Earnings_USD"] != 137)
+    ]
+    assert [row["Freelancer_ID"] for row in result] == expected[
+        "Freelancer_ID"
+    ].tolist()
+
+
+def test_operands_beyond_int64(reference):
+    below = query_csv_data(
+        select=["Freelancer_ID"], where={"Earnings_USD": {"$lt": 10**20}}
+    )
+    listed = query_csv_data(
+        select=["Freelancer_ID"], where={"Earnings_USD": [10**20, 137]}
+    )
+
+    assert len(below) == len(reference)
+    assert [row["Freelancer_ID"] for row in listed] == reference.loc[
+        reference["Earnings_USD"] == 137, "Freelancer_ID"
+    ].tolist()